@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+"""
+Bulk data collection from the OpenFDA 510(k) API.
+
+This script fetches 510(k) device records from OpenFDA in paginated batches,
+saves raw batch files to disk, and upserts the projected device documents
+into MongoDB for the Predicate Relationships Graph.
+"""
+
+import argparse
+import asyncio
+import atexit
+import functools
+import glob
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.utils.config import (
+    setup_logging,
+    DATA_DIR,
+    OPENFDA_RPM_LIMIT,
+    OPENFDA_DAILY_LIMIT,
+)
+from src.db.mongodb import get_devices_collection, get_devices_count
+
+# Setup logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# OpenFDA API settings
+OPENFDA_API_BASE_URL = "https://api.fda.gov/device/510k.json"
+DEFAULT_TIMEOUT = 30  # seconds
+MAX_RETRIES = 3
+
+# Concurrency cap for the async page fan-out (per-host, to stay polite to OpenFDA)
+CONCURRENT_REQUEST_LIMIT = 16
+CONCURRENT_RANGE_LIMIT = 8
+
+# OpenFDA caps pagination at skip + limit <= 25000
+MAX_PAGINATION_DEPTH = 25000
+
+# Accumulate at least this many ops before each MongoDB bulk write
+BULK_WRITE_THRESHOLD = 5000
+
+# Fields projected from each OpenFDA record into the device document
+_FIELDS = ('k_number', 'device_name', 'applicant', 'decision_date', 'product_code',
+           'statement_or_summary', 'decision_description')
+
+# Server-side projection: only download the fields we persist (the full
+# 510(k) document carries ~30-50 fields we never use)
+_FIELDS_PARAM = ','.join(_FIELDS)
+
+# Shared HTTP session so urllib3 keep-alive reuses the TLS connection to
+# api.fda.gov across thousands of paginated calls instead of paying the
+# TCP + TLS handshake per request.
+_SESSION = requests.Session()
+_RETRIES = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                 respect_retry_after_header=True, allowed_methods=frozenset(['GET']))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                                       max_retries=_RETRIES))
+_SESSION.headers.update({
+    "Accept-Encoding": "gzip",
+    "User-Agent": "predicate-graph/1.0",
+})
+atexit.register(_SESSION.close)
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_ymd(s: str) -> Optional[datetime]:
+    """
+    Parse a YYYY-MM-DD date string into a datetime.
+
+    Cached because distinct decision dates number in the low thousands while
+    records number in the hundreds of thousands; a cache hit skips parsing
+    entirely.
+
+    Args:
+        s: The date string to parse
+
+    Returns:
+        The parsed datetime, or None if the string is not a valid date
+    """
+    try:
+        return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+    except ValueError:
+        return None
+
+
+def fetch_knumbers(limit: int = 100, skip: int = 0, api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a single page of 510(k) records from the OpenFDA API.
+
+    Args:
+        limit: Number of records to fetch (max 1000)
+        skip: Number of records to skip
+        api_key: Optional OpenFDA API key for higher rate limits
+
+    Returns:
+        The decoded JSON response, or None if the request failed
+    """
+    params: Dict[str, Any] = {"limit": limit, "skip": skip, "fields": _FIELDS_PARAM}
+    if api_key:
+        params["api_key"] = api_key
+
+    try:
+        _RATE_LIMITER.acquire()
+        response = _SESSION.get(OPENFDA_API_BASE_URL, params=params, timeout=(5, DEFAULT_TIMEOUT))
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except requests.RequestException as e:
+        logger.error(f"Request error fetching from OpenFDA: {str(e)}")
+        return None
+
+
+def fetch_knumbers_by_date_range(start_date: str, end_date: str, limit: int = 1000,
+                                 skip: int = 0, api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a page of 510(k) records whose decision_date falls in the given range.
+
+    Args:
+        start_date: Range start in YYYY-MM-DD format
+        end_date: Range end in YYYY-MM-DD format
+        limit: Number of records to fetch (max 1000)
+        skip: Number of records to skip
+        api_key: Optional OpenFDA API key for higher rate limits
+
+    Returns:
+        The decoded JSON response, or None if the request failed
+    """
+    # Let requests build and encode the query string; the brackets and the
+    # space in the range search are not URL-safe as a raw f-string
+    params: Dict[str, Any] = {
+        "search": f"decision_date:[{start_date} TO {end_date}]",
+        "limit": limit,
+        "skip": skip,
+        "fields": _FIELDS_PARAM,
+    }
+    if api_key:
+        params["api_key"] = api_key
+
+    try:
+        _RATE_LIMITER.acquire()
+        response = _SESSION.get(OPENFDA_API_BASE_URL, params=params,
+                                timeout=(5, DEFAULT_TIMEOUT))
+        if response.status_code == 404:
+            # No records in this range
+            return None
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except requests.RequestException as e:
+        logger.error(f"Request error fetching range {start_date}..{end_date}: {str(e)}")
+        return None
+
+
+def save_data_to_json(data: Any, filepath: str) -> None:
+    """
+    Save data to a JSON file.
+
+    Args:
+        data: The data to serialize
+        filepath: Destination file path
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    logger.debug("Saved data to %s", filepath)
+
+
+def load_data_from_json(filepath: str) -> Any:
+    """
+    Load data from a JSON file.
+
+    Args:
+        filepath: Source file path
+
+    Returns:
+        The deserialized data
+    """
+    with open(filepath, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def get_date_ranges(start_year: int = 1976, end_year: Optional[int] = None) -> List[tuple]:
+    """
+    Build the list of (start_date, end_date) chunks used for paginated fetching.
+
+    OpenFDA caps pagination at skip+limit <= 25000. Busy 5-year windows
+    exceed that, so the history is split into single years, which also lets
+    independent ranges be fetched concurrently.
+
+    Args:
+        start_year: First year to include
+        end_year: Last year to include (defaults to the current year)
+
+    Returns:
+        List of (start_date, end_date) tuples
+    """
+    if end_year is None:
+        end_year = datetime.now().year
+
+    return [(f"{year}-01-01", f"{year}-12-31")
+            for year in range(start_year, end_year + 1)]
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window rate limiter keyed to the OpenFDA per-minute and per-day quotas.
+
+    Requests acquire a token before going out, so the first 429 never
+    happens instead of being retried after the fact.
+    """
+
+    def __init__(self, rpm_limit: int = OPENFDA_RPM_LIMIT,
+                 daily_limit: int = OPENFDA_DAILY_LIMIT):
+        self._rpm_limit = rpm_limit
+        self._daily_limit = daily_limit
+        self._minute_window: deque = deque()
+        self._day_window: deque = deque()
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        """Drop expired window entries and return the required wait in seconds."""
+        while self._minute_window and now - self._minute_window[0] >= 60:
+            self._minute_window.popleft()
+        while self._day_window and now - self._day_window[0] >= 86400:
+            self._day_window.popleft()
+        wait = 0.0
+        if len(self._minute_window) >= self._rpm_limit:
+            wait = max(wait, self._minute_window[0] + 60 - now)
+        if len(self._day_window) >= self._daily_limit:
+            wait = max(wait, self._day_window[0] + 86400 - now)
+        return wait
+
+    def acquire(self) -> None:
+        """Block until a request token is available (sync callers)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._minute_window.append(now)
+                    self._day_window.append(now)
+                    return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait until a request token is available without blocking the loop."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._minute_window.append(now)
+                    self._day_window.append(now)
+                    return
+            await asyncio.sleep(wait)
+
+
+# Shared limiter covering both the sync and async fetch paths
+_RATE_LIMITER = SlidingWindowRateLimiter()
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease controller for request concurrency.
+
+    The effective concurrency creeps up by ALPHA after each healthy response
+    and is halved on 429/5xx responses or when the mean latency over the
+    recent window exceeds the target, keeping offered load near the knee of
+    the server's throughput curve instead of relying on blind backoff.
+    """
+
+    ALPHA = 0.5
+    BETA = 0.5
+    LATENCY_WINDOW = 32
+    LATENCY_TARGET = 2.0  # seconds
+
+    def __init__(self, initial: int = 4, max_concurrency: int = CONCURRENT_REQUEST_LIMIT):
+        self._limit = float(initial)
+        self._max = float(max_concurrency)
+        self._active = 0
+        self._pause_until = 0.0
+        self._latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current integer concurrency limit (never below 1)."""
+        return max(1, int(self._limit))
+
+    async def acquire(self) -> None:
+        """Wait for a concurrency slot, honoring any server-requested pause."""
+        async with self._condition:
+            while self._active >= self.limit:
+                await self._condition.wait()
+            self._active += 1
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self) -> None:
+        """Release a concurrency slot."""
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    async def adjust(self, latency: float, status_code: int,
+                     pause: Optional[float] = None) -> None:
+        """
+        Update the concurrency limit from the outcome of one request.
+
+        Args:
+            latency: Observed request latency in seconds
+            status_code: HTTP status code of the response
+            pause: Optional server-requested pause (e.g. from Retry-After)
+        """
+        async with self._condition:
+            self._latencies.append(latency)
+            mean_latency = sum(self._latencies) / len(self._latencies)
+            if status_code == 429 or status_code >= 500 or mean_latency > self.LATENCY_TARGET:
+                self._limit = max(1.0, float(int(self._limit * self.BETA)))
+            else:
+                self._limit = min(self._max, self._limit + self.ALPHA)
+            if pause:
+                self._pause_until = max(self._pause_until, time.monotonic() + pause)
+            self._condition.notify_all()
+
+
+def _throttle_hint(response: httpx.Response) -> Optional[float]:
+    """
+    Extract a server-requested pause from rate-limit response headers.
+
+    Args:
+        response: The HTTP response to inspect
+
+    Returns:
+        Pause duration in seconds, or None if the server gave no hint
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+    # Preempt the next 429 when the quota window is exhausted
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        return 1.0
+    return None
+
+
+async def _fetch_page(client: httpx.AsyncClient, controller: AIMDController,
+                      start_date: str, end_date: str, limit: int, skip: int,
+                      api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a single page of a date range asynchronously.
+
+    Args:
+        client: Shared async HTTP client
+        controller: AIMD concurrency controller shared across page tasks
+        start_date: Range start in YYYY-MM-DD format
+        end_date: Range end in YYYY-MM-DD format
+        limit: Number of records to fetch (max 1000)
+        skip: Number of records to skip
+        api_key: Optional OpenFDA API key for higher rate limits
+
+    Returns:
+        The decoded JSON response, or None if the request failed
+    """
+    url = (f"{OPENFDA_API_BASE_URL}?search=decision_date:[{start_date}+TO+{end_date}]"
+           f"&limit={limit}&skip={skip}&fields={_FIELDS_PARAM}")
+    if api_key:
+        url += f"&api_key={api_key}"
+
+    await controller.acquire()
+    try:
+        for attempt in range(MAX_RETRIES):
+            try:
+                await _RATE_LIMITER.acquire_async()
+                started = time.monotonic()
+                response = await client.get(url, timeout=DEFAULT_TIMEOUT)
+                latency = time.monotonic() - started
+                await controller.adjust(latency, response.status_code,
+                                        pause=_throttle_hint(response))
+                if response.status_code == 200:
+                    return orjson.loads(response.content)
+                if response.status_code == 429:
+                    logger.warning(f"Rate limited by OpenFDA, concurrency now "
+                                   f"{controller.limit}")
+                    continue
+                if response.status_code == 404:
+                    return None
+                logger.error(f"Error fetching page skip={skip} of {start_date}..{end_date}: "
+                             f"{response.status_code}")
+                return None
+            except httpx.HTTPError as e:
+                logger.error(f"Request error fetching page skip={skip} of "
+                             f"{start_date}..{end_date}: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
+    finally:
+        await controller.release()
+
+    return None
+
+
+async def _fetch_range_pages(client: httpx.AsyncClient, controller: AIMDController,
+                             start_date: str, end_date: str, total_for_range: int,
+                             batch_size: int, api_key: Optional[str] = None,
+                             first_skip: int = 0) -> List[Dict[str, Any]]:
+    """
+    Fan out all page fetches for a date range concurrently.
+
+    Args:
+        client: Shared async HTTP client
+        controller: AIMD concurrency controller shared across ranges
+        start_date: Range start in YYYY-MM-DD format
+        end_date: Range end in YYYY-MM-DD format
+        total_for_range: Total record count reported by the API for this range
+        batch_size: Records per page (max 1000)
+        api_key: Optional OpenFDA API key for higher rate limits
+        first_skip: Skip offset to start from (when earlier pages were already fetched)
+
+    Returns:
+        List of successfully fetched page responses, in skip order
+    """
+    skips = range(first_skip, min(total_for_range, MAX_PAGINATION_DEPTH), batch_size)
+    tasks = [_fetch_page(client, controller, start_date, end_date, batch_size, skip, api_key)
+             for skip in skips]
+    pages = await asyncio.gather(*tasks)
+    return [page for page in pages if page and page.get('results')]
+
+
+def fetch_all_knumbers_by_date_ranges(api_key: Optional[str] = None, batch_size: int = 1000,
+                                      start_year: int = 1976,
+                                      initial_load: bool = False) -> List[str]:
+    """
+    Fetch all 510(k) records across the full date range and store them.
+
+    For each date range, fans the page fetches out concurrently (bounded by
+    CONCURRENT_REQUEST_LIMIT), saves each batch to a JSON file under
+    DATA_DIR, and upserts the device documents into MongoDB.
+
+    Args:
+        api_key: Optional OpenFDA API key for higher rate limits
+        batch_size: Records per page (max 1000)
+        start_year: First year to fetch
+        initial_load: When loading into an empty collection, use the
+            insert_many fast path and fall back to upserts only for
+            documents that turn out to already exist
+
+    Returns:
+        List of all unique K-numbers fetched
+    """
+    mongodb_collection = get_devices_collection()
+
+    # A set accumulator deduplicates as we go instead of a final list(set(...)) pass
+    all_knumbers: Set[str] = set()
+    date_ranges = get_date_ranges(start_year=start_year)
+    batch_index = 0
+    pending_ops: List[UpdateOne] = []
+    pending_docs: List[Dict[str, Any]] = []
+    total_skipped = 0
+
+    def _flush_ops() -> None:
+        nonlocal total_skipped
+        if initial_load:
+            if not pending_docs:
+                return
+            try:
+                mongodb_collection.insert_many(pending_docs, ordered=False,
+                                               bypass_document_validation=True)
+                logger.info(f"Inserted {len(pending_docs)} new documents")
+            except BulkWriteError as bwe:
+                # Documents that already existed fall back to the upsert path.
+                # insert_many added a client-side _id to each doc; drop it so
+                # the $set never touches the existing document's _id
+                retry_ops = []
+                for err in bwe.details.get('writeErrors', []):
+                    doc = dict(err['op'])
+                    doc.pop('_id', None)
+                    retry_ops.append(UpdateOne({'k_number': doc['k_number']},
+                                               {'$set': doc}, upsert=True))
+                if retry_ops:
+                    try:
+                        mongodb_collection.bulk_write(retry_ops, ordered=False)
+                    except BulkWriteError as retry_bwe:
+                        retry_errors = retry_bwe.details.get('writeErrors', [])
+                        total_skipped += len(retry_errors)
+                        logger.warning(f"Upsert retry completed with "
+                                       f"{len(retry_errors)} skipped ops")
+                logger.info(f"Inserted {len(pending_docs) - len(retry_ops)} new documents, "
+                            f"upserted {len(retry_ops)} existing")
+            pending_docs.clear()
+            return
+        if not pending_ops:
+            return
+        try:
+            result = mongodb_collection.bulk_write(pending_ops, ordered=False,
+                                                   bypass_document_validation=True)
+            logger.info(f"Flushed {len(pending_ops)} ops: {result.upserted_count} inserted, "
+                        f"{result.modified_count} updated")
+        except BulkWriteError as bwe:
+            write_errors = bwe.details.get('writeErrors', [])
+            total_skipped += len(write_errors)
+            logger.warning(f"Bulk write completed with {len(write_errors)} skipped ops")
+        pending_ops.clear()
+
+    async def _run() -> None:
+        controller = AIMDController()
+        # Yearly ranges are independent, so several can be in flight at once;
+        # the shared controller still bounds total request concurrency
+        range_gate = asyncio.Semaphore(CONCURRENT_RANGE_LIMIT)
+
+        async def _run_range(http_client: httpx.AsyncClient,
+                             start_date: str, end_date: str) -> None:
+            nonlocal batch_index
+            async with range_gate:
+                # The first real page doubles as the total-count probe, so no
+                # separate limit=1 meta request is needed per range
+                first_page = await _fetch_page(http_client, controller, start_date,
+                                               end_date, batch_size, 0, api_key)
+                if not first_page or not first_page.get('results'):
+                    logger.info(f"No results for range {start_date}..{end_date}")
+                    return
+
+                total_for_range = first_page['meta']['results']['total']
+                logger.info(f"Range {start_date}..{end_date}: {total_for_range} records")
+                batch_index = _process_page(first_page['results'], batch_index)
+
+                if total_for_range > batch_size:
+                    pages = await _fetch_range_pages(http_client, controller, start_date,
+                                                     end_date, total_for_range, batch_size,
+                                                     api_key, first_skip=batch_size)
+                    for response in pages:
+                        batch_index = _process_page(response['results'], batch_index)
+                # Don't leave partially filled batches pending across ranges
+                _flush_ops()
+
+        async with httpx.AsyncClient() as http_client:
+            await asyncio.gather(*(_run_range(http_client, start_date, end_date)
+                                   for start_date, end_date in date_ranges))
+
+    def _process_page(records: List[Dict[str, Any]], batch_index: int) -> int:
+        batch_devices_info = []
+        for record in records:
+            k_number = record.get('k_number')
+            if not k_number:
+                continue
+            device_info = {f: record.get(f, '') or '' for f in _FIELDS}
+            decision_date = device_info['decision_date']
+            if len(decision_date) == 10:
+                sortable = _parse_ymd(decision_date)
+                if sortable is not None:
+                    device_info['sortable_date'] = sortable
+            batch_devices_info.append(device_info)
+            all_knumbers.add(k_number)
+            if initial_load:
+                pending_docs.append(device_info)
+            else:
+                # Filter on k_number (unique-indexed) so upserts match the
+                # documents the API write path creates with ObjectId _ids
+                pending_ops.append(UpdateOne(
+                    {'k_number': k_number},
+                    {'$set': device_info},
+                    upsert=True
+                ))
+        if len(pending_ops) + len(pending_docs) >= BULK_WRITE_THRESHOLD:
+            _flush_ops()
+
+        batch_file = os.path.join(DATA_DIR, f"devices_data_batch_{batch_index}.json")
+        save_data_to_json(batch_devices_info, batch_file)
+        return batch_index + 1
+
+    asyncio.run(_run())
+    _flush_ops()
+    if total_skipped:
+        logger.warning(f"Skipped {total_skipped} ops due to write errors")
+
+    unique_knumbers = sorted(all_knumbers)
+    save_data_to_json(unique_knumbers, os.path.join(DATA_DIR, "all_knumbers.json"))
+    logger.info(f"Fetched {len(unique_knumbers)} unique K-numbers; database now holds "
+                f"{get_devices_count()} devices")
+    return unique_knumbers
+
+
+def _load_and_project(filepath: str) -> tuple:
+    """
+    Load one batch file and build upsert op specs for its records.
+
+    Runs in worker processes, so the ops are returned as plain dicts that
+    cross the pickle boundary cheaply and are wrapped in UpdateOne by the
+    consumer.
+
+    Args:
+        filepath: Path to the batch file
+
+    Returns:
+        Tuple of (op_specs, batch_knumbers) where batch_knumbers is a set
+    """
+    records = load_data_from_json(filepath)
+
+    batch_knumbers: Set[str] = set()
+    op_specs = []
+    for record in records:
+        k_number = record.get('k_number')
+        if not k_number:
+            continue
+        device_info = {f: record.get(f, '') or '' for f in _FIELDS}
+        decision_date = device_info['decision_date']
+        if len(decision_date) == 10:
+            sortable = _parse_ymd(decision_date)
+            if sortable is not None:
+                device_info['sortable_date'] = sortable
+        op_specs.append({'filter': {'k_number': k_number}, 'update': {'$set': device_info}})
+        batch_knumbers.add(k_number)
+
+    return op_specs, batch_knumbers
+
+
+def process_batch_files() -> List[str]:
+    """
+    Re-process previously saved batch files and upsert them into MongoDB.
+
+    Useful for re-loading the database from disk without hitting OpenFDA again.
+    Batch files are read and projected in a process pool so disk I/O and JSON
+    parsing overlap with the MongoDB bulk writes issued by the main thread.
+
+    Returns:
+        List of all unique K-numbers found in the batch files
+    """
+    mongodb_collection = get_devices_collection()
+
+    all_knumbers: Set[str] = set()
+
+    batch_files = sorted(glob.iglob(os.path.join(DATA_DIR, "devices_data_batch_*.json")))
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for op_specs, batch_knumbers in executor.map(_load_and_project, batch_files,
+                                                     chunksize=4):
+            if op_specs:
+                result = mongodb_collection.bulk_write(
+                    [UpdateOne(spec['filter'], spec['update'], upsert=True)
+                     for spec in op_specs],
+                    ordered=False
+                )
+                logger.info("Saved batch: %d inserted, %d updated",
+                            result.upserted_count, result.modified_count)
+            all_knumbers.update(batch_knumbers)
+
+    unique_knumbers = sorted(all_knumbers)
+    save_data_to_json(unique_knumbers, os.path.join(DATA_DIR, "all_knumbers.json"))
+    logger.info(f"Processed {len(unique_knumbers)} unique K-numbers from batch files; "
+                f"database now holds {get_devices_count()} devices")
+    return unique_knumbers
+
+
+def main():
+    """Command-line entry point for the bulk fetcher."""
+    parser = argparse.ArgumentParser(description="Bulk-fetch 510(k) device data from OpenFDA")
+    parser.add_argument('--mode', choices=['fetch', 'process'], default='fetch',
+                        help="fetch: pull from OpenFDA; process: re-load saved batch files")
+    parser.add_argument('--api-key', default=os.environ.get('OPENFDA_API_KEY'),
+                        help="OpenFDA API key (defaults to OPENFDA_API_KEY env var)")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="Records per page (max 1000)")
+    parser.add_argument('--start-year', type=int, default=1976,
+                        help="First year of decision dates to fetch")
+    parser.add_argument('--initial-load', action='store_true',
+                        help="Assume an empty collection and use the insert fast path")
+    args = parser.parse_args()
+
+    if args.mode == 'fetch':
+        fetch_all_knumbers_by_date_ranges(api_key=args.api_key, batch_size=args.batch_size,
+                                          start_year=args.start_year,
+                                          initial_load=args.initial_load)
+    else:
+        process_batch_files()
+
+
+if __name__ == "__main__":
+    main()
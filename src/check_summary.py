@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check FDA 510(k) detail pages for summary/statement documents.
+
+Fetches the accessdata.fda.gov detail page for a K-number and pulls out
+the links, table rows, and embedded frames that point at a 510(k)
+summary, using a single lxml parse per page.
+"""
+
+import argparse
+import logging
+from typing import Any, Dict, List
+
+import lxml.html
+
+from src.api import _SESSION, DEFAULT_TIMEOUT
+from src.pdf.processor import normalize_knumber
+from src.utils.config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DETAIL_URL = "https://www.accessdata.fda.gov/scripts/cdrh/cfdocs/cfpmn/pmn.cfm"
+
+_RE_NS = {'re': 'http://exslt.org/regular-expressions'}
+_LINK_XPATH = ("//a[re:test(., 'summary|pdf|statement|predicate|510\\(k\\)', 'i')"
+               " or re:test(@href, '\\.pdf$', 'i')]/@href")
+_ROW_XPATH = "//tr[re:test(., 'predicate|510\\(k\\)|substantially equivalent', 'i')]"
+_IFRAME_XPATH = "//iframe/@src"
+
+
+def check_summary_page(k_number: str) -> Dict[str, Any]:
+    """
+    Fetch a K-number's detail page and extract summary-related content.
+
+    Args:
+        k_number: The K-number to look up
+
+    Returns:
+        Dictionary with the document links, matching table-row texts, and
+        iframe sources found on the page
+    """
+    k_number = normalize_knumber(k_number)
+    result: Dict[str, Any] = {
+        'k_number': k_number,
+        'links': [],
+        'rows': [],
+        'iframes': [],
+    }
+
+    try:
+        response = _SESSION.get(DETAIL_URL, params={'ID': k_number},
+                                timeout=(5, DEFAULT_TIMEOUT))
+        response.raise_for_status()
+    except Exception as e:
+        logger.error(f"Error fetching detail page for {k_number}: {str(e)}")
+        return result
+
+    tree = lxml.html.fromstring(response.content)
+    result['links'] = tree.xpath(_LINK_XPATH, namespaces=_RE_NS)
+    result['rows'] = [row.text_content().strip()
+                      for row in tree.xpath(_ROW_XPATH, namespaces=_RE_NS)]
+    result['iframes'] = tree.xpath(_IFRAME_XPATH)
+
+    logger.info("Detail page for %s: %d links, %d rows, %d iframes",
+                k_number, len(result['links']), len(result['rows']),
+                len(result['iframes']))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check 510(k) detail pages for summaries")
+    parser.add_argument('k_numbers', nargs='+', help="K-numbers to check")
+    args = parser.parse_args()
+
+    setup_logging()
+    for k_number in args.k_numbers:
+        result = check_summary_page(k_number)
+        for link in result['links']:
+            print(f"{result['k_number']}\t{link}")
+
+
+if __name__ == "__main__":
+    main()
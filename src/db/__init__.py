@@ -2,5 +2,27 @@
 Database functionality for the Predicate Device Analyzer.
 
 This package provides database connectivity and operations for storing
-device and predicate relationship data.
+device and predicate relationship data. All helpers share the pooled
+client in src.db.mongodb and are re-exported here so callers can import
+from src.db directly.
 """
+
+from src.db.mongodb import (
+    initialize_db_connection,
+    close_db_connection,
+    get_database_connection,
+    get_devices_collection,
+    save_device_to_mongodb,
+    save_devices_to_mongodb,
+    process_device_for_mongodb,
+    get_device_by_knumber,
+    get_device_exists,
+    get_devices_by_knumbers,
+    iter_all_knumbers,
+    get_all_knumbers,
+    get_all_knumbers_set,
+    get_devices_count,
+    ensure_indexes,
+    test_mongodb_connection,
+    LIGHT_PROJECTION,
+)
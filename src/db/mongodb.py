@@ -5,21 +5,46 @@ MongoDB operations for the Predicate Relationships Graph.
 This module handles connecting to MongoDB and storing/retrieving data.
 """
 
+import atexit
 import logging
-from typing import Dict, Any, Optional
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Set
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.write_concern import WriteConcern
 
-from src.utils.config import MONGODB_URI, MONGODB_DB, MONGODB_DEVICES_COLLECTION
+from src.utils.config import (MONGODB_URI, MONGODB_DB, MONGODB_DEVICES_COLLECTION,
+                              MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE)
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Projection for traversal reads that only need device metadata; the free
+# text fields can be multi-KB each
+LIGHT_PROJECTION = {'statement_or_summary': 0, 'decision_description': 0}
+
+# Bulk writes are split into sub-batches and dispatched across pooled
+# connections; ~1000 ops per request stays under the server's batch limits
+BULK_CHUNK_SIZE = 1000
+BULK_WRITE_WORKERS = 8
+
+# Ingest batches come from a reproducible external API, so waiting on the
+# journal fsync per batch buys nothing; interactive single-doc writes keep
+# the default write concern
+_INGEST_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
 # Global connection instance for connection pooling
 _mongo_client = None
 _db = None
 _devices_collection = None
 _is_initialized = False
+_indexes_ensured = False
 
 def initialize_db_connection():
     """
@@ -29,33 +54,51 @@ def initialize_db_connection():
     Returns:
         bool: True if connection was successful, False otherwise
     """
-    global _mongo_client, _db, _devices_collection, _is_initialized
+    global _mongo_client, _db, _devices_collection, _is_initialized, _indexes_ensured
     
     if _is_initialized:
         return True
     
     try:
-        _mongo_client = MongoClient(MONGODB_URI, maxPoolSize=10)
+        # minPoolSize keeps warm connections around so workers don't pay
+        # handshake latency on first use; the wait-queue timeout surfaces
+        # pool exhaustion instead of hanging callers
+        _mongo_client = MongoClient(
+            MONGODB_URI,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=300000,
+            waitQueueTimeoutMS=10000,
+            retryWrites=True,
+        )
         # Test connection
         _mongo_client.admin.command('ping')
         _db = _mongo_client[MONGODB_DB]
         _devices_collection = _db[MONGODB_DEVICES_COLLECTION]
         
-        # Ensure index on k_number exists
-        if 'k_number_1' not in _devices_collection.index_information():
-            _devices_collection.create_index("k_number", unique=True)
-            logger.info("Created index on k_number field")
-        
         logger.info(f"Connected to MongoDB at {MONGODB_URI.split('@')[1].split('/?')[0] if '@' in MONGODB_URI else MONGODB_URI}")
         _is_initialized = True
+
+        # Indexes are ensured exactly once per process, here rather than on
+        # every save call
+        if not _indexes_ensured:
+            ensure_indexes()
+            _indexes_ensured = True
         return True
     except PyMongoError as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         _is_initialized = False
         return False
 
-# Initialize connection at module load time
-initialize_db_connection()
+def close_db_connection():
+    """Close the shared MongoDB client (registered to run at exit)."""
+    global _mongo_client, _is_initialized
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+        _is_initialized = False
+
+atexit.register(close_db_connection)
 
 def get_database_connection() -> MongoClient:
     """
@@ -119,9 +162,9 @@ def save_device_to_mongodb(device_data: Dict[str, Any]) -> bool:
         )
         
         if result.upserted_id:
-            logger.info(f"Inserted device {device_to_save['k_number']} into MongoDB")
+            logger.debug("Inserted device %s into MongoDB", device_to_save['k_number'])
         else:
-            logger.info(f"Updated device {device_to_save['k_number']} in MongoDB")
+            logger.debug("Updated device %s in MongoDB", device_to_save['k_number'])
         
         return True
         
@@ -130,12 +173,15 @@ def save_device_to_mongodb(device_data: Dict[str, Any]) -> bool:
         return False
 
 
-def get_device_by_knumber(k_number: str) -> Optional[Dict[str, Any]]:
+def get_device_by_knumber(k_number: str,
+                          projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
     """
     Get a device by its K-number
     
     Args:
         k_number: The K-number to look up
+        projection: Optional field projection; pass LIGHT_PROJECTION to
+            skip the heavy free-text fields on traversal reads
         
     Returns:
         Device dictionary or None if not found
@@ -145,7 +191,56 @@ def get_device_by_knumber(k_number: str) -> Optional[Dict[str, Any]]:
         return None
         
     collection = get_devices_collection()
-    return collection.find_one({"k_number": k_number})
+    return collection.find_one({"k_number": k_number}, projection)
+
+
+def get_device_exists(k_number: str) -> bool:
+    """
+    Check whether a device exists without fetching its document.
+
+    The limit-1 count resolves on the k_number index, so no document
+    bytes cross the wire.
+
+    Args:
+        k_number: The K-number to check
+
+    Returns:
+        bool: True if a device with that K-number exists
+    """
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot check device: MongoDB connection not available")
+        return False
+
+    return get_devices_collection().count_documents({'k_number': k_number}, limit=1) > 0
+
+
+def get_devices_by_knumbers(k_numbers: List[str],
+                            projection: Optional[Dict[str, int]] = LIGHT_PROJECTION) -> Dict[str, Dict[str, Any]]:
+    """
+    Get multiple devices in a single query.
+
+    Graph traversals resolve one BFS level at a time; fetching the whole
+    level with $in costs one round-trip instead of one per device.
+
+    Args:
+        k_numbers: The K-numbers to look up
+        projection: Field projection; defaults to LIGHT_PROJECTION since
+            traversal only needs metadata, pass None for full documents
+
+    Returns:
+        Dictionary mapping each found K-number to its device document
+    """
+    if not k_numbers:
+        return {}
+
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot get devices: MongoDB connection not available")
+        return {}
+
+    collection = get_devices_collection()
+    cursor = collection.find({'k_number': {'$in': list(k_numbers)}}, projection,
+                             batch_size=1000)
+    return {d['k_number']: d for d in cursor}
 
 
 def test_mongodb_connection() -> Dict[str, Any]:
@@ -190,12 +285,253 @@ def test_mongodb_connection() -> Dict[str, Any]:
             result["collection_exists"] = MONGODB_DEVICES_COLLECTION in collection_names
             
             if result["collection_exists"]:
-                # Get device count
-                result["device_count"] = db[MONGODB_DEVICES_COLLECTION].count_documents({})
+                # Get device count (metadata estimate; avoids a full scan)
+                result["device_count"] = db[MONGODB_DEVICES_COLLECTION].estimated_document_count()
         
         return result
     except PyMongoError as e:
         result["success"] = False
         result["error"] = str(e)
         logger.error(f"MongoDB connection test failed: {str(e)}")
-        return result 
\ No newline at end of file
+        return result 
+
+@lru_cache(maxsize=8192)
+def _parse_decision_date(decision_date: str) -> Optional[datetime]:
+    """
+    Parse an ISO decision date, caching by the date string.
+
+    FDA decision dates repeat heavily across records, so for N records
+    with K distinct dates only K parses actually run.
+
+    Args:
+        decision_date: Date string in YYYY-MM-DD format
+
+    Returns:
+        The parsed datetime, or None if the string is not a valid date
+    """
+    try:
+        return datetime.fromisoformat(decision_date)
+    except ValueError:
+        return None
+
+
+def process_device_for_mongodb(device_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Project a raw device record into the document shape stored in MongoDB.
+
+    Args:
+        device_data: Raw device record (e.g. from the OpenFDA API)
+
+    Returns:
+        The processed device document, or None if the record is unusable
+    """
+    if not device_data or not device_data.get('k_number'):
+        return None
+
+    decision_date = device_data.get('decision_date', '')
+    sortable_date = _parse_decision_date(decision_date) if decision_date else None
+
+    processed_device = {
+        'k_number': device_data.get('k_number'),
+        'device_name': device_data.get('device_name', ''),
+        'applicant': device_data.get('applicant', ''),
+        'decision_date': decision_date,
+        'product_code': device_data.get('product_code', ''),
+        'statement_or_summary': device_data.get('statement_or_summary', ''),
+        'decision_description': device_data.get('decision_description', ''),
+    }
+    if sortable_date is not None:
+        processed_device['sortable_date'] = sortable_date
+
+    return processed_device
+
+
+def save_devices_to_mongodb(devices_data: List[Dict[str, Any]],
+                            insert_only: bool = False) -> bool:
+    """
+    Save a batch of device documents to MongoDB with one bulk write.
+
+    Args:
+        devices_data: List of device records to upsert
+        insert_only: Set when every record is known to be new (e.g. the
+            initial load) to take the plain-insert fast path, which skips
+            the per-op filter match of an upsert
+
+    Returns:
+        bool: True if the bulk write succeeded, False otherwise
+    """
+    if not devices_data:
+        return True
+
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot save devices: MongoDB connection not available")
+        return False
+
+    try:
+        collection = get_devices_collection().with_options(
+            write_concern=_INGEST_WRITE_CONCERN)
+
+        def _docs():
+            # Fused transform-and-wrap pass: each processed device is
+            # consumed immediately instead of being staged in a second list
+            for device in devices_data:
+                processed = process_device_for_mongodb(device)
+                if processed:
+                    yield processed
+
+        def _ops():
+            for processed in _docs():
+                # Whole-document replace skips the $set operator
+                # pipeline server-side; partial updates (e.g. writing
+                # predicate_devices) still go through update_one.
+                # Pre-encoding to raw BSON means retried batches reuse the
+                # bytes instead of re-encoding every document
+                yield ReplaceOne(
+                    {'k_number': processed['k_number']},
+                    RawBSONDocument(bson.encode(processed)),
+                    upsert=True
+                )
+
+        def _chunks(ops, size):
+            ops = iter(ops)
+            while chunk := list(islice(ops, size)):
+                yield chunk
+
+        def _write_chunk(chunk):
+            try:
+                result = collection.bulk_write(chunk, ordered=False,
+                                               bypass_document_validation=True)
+                return result.upserted_count, result.modified_count, 0
+            except BulkWriteError as bwe:
+                # Unordered writes keep going past individual failures;
+                # report what actually landed
+                details = bwe.details or {}
+                return (details.get('nUpserted', 0), details.get('nModified', 0),
+                        len(details.get('writeErrors', [])))
+
+        def _insert_chunk(chunk):
+            try:
+                collection.insert_many(chunk, ordered=False,
+                                       bypass_document_validation=True)
+                return len(chunk), 0, 0
+            except BulkWriteError as bwe:
+                # Accidental duplicates surface here; count them as failed
+                # rather than silently retrying the whole chunk
+                errors = (bwe.details or {}).get('writeErrors', [])
+                return len(chunk) - len(errors), 0, len(errors)
+
+        if insert_only:
+            writer, source = _insert_chunk, _docs()
+        else:
+            writer, source = _write_chunk, _ops()
+
+        upserted = modified = failed = 0
+        with ThreadPoolExecutor(max_workers=BULK_WRITE_WORKERS) as executor:
+            for chunk_upserted, chunk_modified, chunk_failed in executor.map(
+                    writer, _chunks(source, BULK_CHUNK_SIZE)):
+                upserted += chunk_upserted
+                modified += chunk_modified
+                failed += chunk_failed
+
+        if failed:
+            logger.warning(f"Bulk save had {failed} failed ops")
+        logger.info(f"Bulk saved devices: {upserted} inserted, {modified} updated")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error bulk saving devices to MongoDB: {str(e)}")
+        return False
+
+
+def iter_all_knumbers() -> Iterator[str]:
+    """
+    Stream the K-numbers of all devices in the collection.
+
+    Uses a large cursor batch size so the round-trip count stays low
+    without materializing every document at once.
+
+    Returns:
+        Iterator of K-numbers
+    """
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot get K-numbers: MongoDB connection not available")
+        return
+
+    collection = get_devices_collection()
+    # Hint the unique k_number index so the projection stays covered
+    # (index-only scan, documents never fetched)
+    cursor = (collection.find({}, {'k_number': 1, '_id': 0})
+              .hint('k_number_1').batch_size(5000))
+    yield from map(itemgetter('k_number'), cursor)
+
+
+def get_all_knumbers() -> List[str]:
+    """
+    Get the K-numbers of all devices in the collection.
+
+    Returns:
+        List of K-numbers
+    """
+    return list(iter_all_knumbers())
+
+
+def get_all_knumbers_set() -> Set[str]:
+    """
+    Get the K-numbers of all devices as a set, computed server-side.
+
+    Returns:
+        Set of K-numbers
+    """
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot get K-numbers: MongoDB connection not available")
+        return set()
+
+    return set(get_devices_collection().distinct('k_number'))
+
+
+def get_devices_count(exact: bool = False) -> int:
+    """
+    Get the number of devices in the collection.
+
+    Args:
+        exact: Use an exact (full-scan) count instead of the O(1)
+            metadata estimate
+
+    Returns:
+        The document count, or 0 if the connection is unavailable
+    """
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot count devices: MongoDB connection not available")
+        return 0
+
+    collection = get_devices_collection()
+    if exact:
+        return collection.count_documents({})
+    return collection.estimated_document_count()
+
+
+def ensure_indexes() -> None:
+    """Create the indexes used by the read and ingest paths."""
+    if not _is_initialized and not initialize_db_connection():
+        logger.error("Cannot ensure indexes: MongoDB connection not available")
+        return
+
+    collection = get_devices_collection()
+    # The k_number index also makes the K-number listing a covered query;
+    # keep it even if lookups move to _id
+    collection.create_index("k_number", unique=True)
+    # Compound index serves product_code equality plus sortable_date
+    # sort/range in one pass, and its prefix covers product_code-only
+    # queries, so no standalone product_code index is needed
+    collection.create_index([('product_code', 1), ('sortable_date', -1)],
+                            name='product_sortdate')
+    collection.create_index("sortable_date")
+    collection.create_index("decision_date")
+    # Multikey entries are maintained per array element, so restrict the
+    # index to documents that actually carry predicates
+    collection.create_index(
+        'predicate_devices',
+        partialFilterExpression={'predicate_devices': {'$exists': True, '$ne': []}},
+        name='predicate_devices_partial'
+    )
+    logger.info("Ensured indexes on devices collection")
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Bulk predicate extraction from FDA 510(k) summary PDFs.
+
+Walks the devices stored in MongoDB (or an explicit K-number list file),
+fetches each device's PDF summary, extracts predicate K-numbers, and
+writes the results back to the devices collection.
+"""
+
+import argparse
+import logging
+import mmap
+import os
+from datetime import datetime, timedelta
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+import requests
+from pymongo import UpdateOne
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.db.mongodb import get_devices_collection
+from src.pdf.utils import (NOT_MODIFIED, fetch_pdf_conditional, get_pdf_predicates,
+                           parse_and_extract, urls_for)
+from src.utils.config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 32
+
+
+def _build_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    """
+    Build a pooled session sized for the download worker count.
+
+    Args:
+        pool_size: Number of connections to keep in the pool
+
+    Returns:
+        A configured requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _download_pdf(url: str, session: requests.Session,
+                  etag: Optional[str] = None,
+                  last_modified: Optional[str] = None) -> Tuple[str, Any, Optional[str], Optional[str]]:
+    """
+    Download one PDF summary, revalidating a stored copy when possible.
+
+    Args:
+        url: The PDF URL to download
+        session: Pooled session to issue the request on
+        etag: Stored ETag for a conditional request
+        last_modified: Stored Last-Modified for a conditional request
+
+    Returns:
+        Tuple of (pdf_url, content, etag, last_modified); content is the
+        PDF bytes, NOT_MODIFIED for a 304, or None when no PDF exists
+    """
+    buf, new_etag, new_last_modified = fetch_pdf_conditional(
+        url, session=session, etag=etag, last_modified=last_modified)
+    if buf is not None and buf is not NOT_MODIFIED:
+        buf = buf.getvalue()
+    return url, buf, new_etag, new_last_modified
+
+
+def process_knumbers_for_pdfs(k_numbers: List[str],
+                              max_workers: int = DEFAULT_MAX_WORKERS,
+                              existence_only: bool = False,
+                              cached: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch and analyze the PDFs for a list of K-numbers concurrently.
+
+    The work runs as a two-stage pipeline: downloads are network-bound and
+    fan out over a thread pool sharing one pooled session, while parsing
+    and predicate extraction are CPU-bound and run on a process pool so
+    the GIL does not serialize them onto one core.
+
+    Args:
+        k_numbers: The K-numbers to process
+        max_workers: Number of concurrent download workers
+        existence_only: Only check PDF existence (HEAD requests, no
+            download or extraction)
+        cached: Per-K-number dicts with stored pdf_etag,
+            pdf_last_modified, and predicate_devices; used for HTTP
+            conditional requests so unchanged PDFs skip download and parse
+
+    Returns:
+        Dictionary mapping each K-number to its result dict
+    """
+    cached = cached or {}
+    results: Dict[str, Dict[str, Any]] = {}
+    session = _build_session(pool_size=max_workers)
+
+    if existence_only:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(get_pdf_predicates, k, session=session,
+                                       existence_only=True): k
+                       for k in k_numbers}
+            for future in as_completed(futures):
+                k_number = futures[future]
+                try:
+                    results[k_number] = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing {k_number}: {str(e)}")
+                    results[k_number] = {'k_number': k_number, 'pdf_exists': False,
+                                         'pdf_url': None, 'predicates': []}
+        return results
+
+    # Stage 1: download the PDF bytes on the thread pool. URLs come from
+    # one batch table lookup rather than a get_pdf_url call per device
+    pdf_urls = urls_for(k_numbers)
+    downloads: Dict[str, Tuple[Optional[str], Any, Optional[str], Optional[str]]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for k, url in zip(k_numbers, pdf_urls):
+            entry = cached.get(k, {})
+            futures[executor.submit(_download_pdf, url, session,
+                                    entry.get('pdf_etag'),
+                                    entry.get('pdf_last_modified'))] = k
+        for future in as_completed(futures):
+            k_number = futures[future]
+            try:
+                downloads[k_number] = future.result()
+            except Exception as e:
+                logger.error(f"Error downloading PDF for {k_number}: {str(e)}")
+                downloads[k_number] = (None, None, None, None)
+
+    for k_number, (url, content, etag, last_modified) in downloads.items():
+        results[k_number] = {'k_number': k_number, 'pdf_exists': False,
+                             'pdf_url': url, 'predicates': [],
+                             'pdf_etag': etag, 'pdf_last_modified': last_modified}
+        if content is NOT_MODIFIED:
+            # 304: the stored predicates are still current, no parse needed
+            results[k_number]['pdf_exists'] = True
+            results[k_number]['predicates'] = cached.get(k_number, {}).get(
+                'predicate_devices', [])
+
+    # Stage 2: parse and extract on a process pool, one core per worker
+    to_parse = [(k, content) for k, (_, content, _, _) in downloads.items()
+                if content is not None and content is not NOT_MODIFIED]
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            extracted = pool.map(parse_and_extract,
+                                 [content for _, content in to_parse],
+                                 [k for k, _ in to_parse],
+                                 chunksize=8)
+            for (k_number, _), (predicates, _, _) in zip(to_parse, extracted):
+                results[k_number]['pdf_exists'] = True
+                results[k_number]['predicates'] = predicates
+
+    return results
+
+
+def extract_predicates_bulk(limit: Optional[int] = None, batch_size: int = 100,
+                            max_workers: int = DEFAULT_MAX_WORKERS,
+                            refresh_days: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Extract predicates for devices in MongoDB and store them back.
+
+    Args:
+        limit: Maximum number of devices to process (None for all)
+        batch_size: Devices per processing batch
+        max_workers: Concurrent PDF workers per batch
+        refresh_days: Also re-process devices last processed more than
+            this many days ago; their stored ETags turn the re-check into
+            conditional GETs (None processes only unprocessed devices)
+
+    Returns:
+        Tuple of (processed_count, updated_count)
+    """
+    collection = get_devices_collection()
+
+    # Anchored exact-format match: the server drops irregular entries, so
+    # the cursor never carries them and no client-side re-filter is needed.
+    # Devices already carrying processed_at are skipped, which makes an
+    # interrupted run resumable from where it stopped; a refresh run also
+    # re-selects devices whose last pass is older than the threshold
+    query = {"k_number": {"$regex": "^K\\d{6}$"}}
+    if refresh_days is None:
+        query["processed_at"] = {"$exists": False}
+    else:
+        cutoff = datetime.utcnow() - timedelta(days=refresh_days)
+        query["$or"] = [{"processed_at": {"$exists": False}},
+                        {"processed_at": {"$lt": cutoff}}]
+    total_devices = collection.count_documents(query)
+    if limit:
+        total_devices = min(total_devices, limit)
+    logger.info(f"Processing {total_devices} devices for PDF predicate extraction")
+
+    # Stream the cursor in server-side batches; memory stays at one batch
+    # instead of the full device list
+    cursor = collection.find(query, {'k_number': 1, '_id': 0}).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    processed = 0
+    updated = 0
+    batch_index = 0
+    while batch := list(islice(cursor, batch_size)):
+        batch_index += 1
+        logger.info("Processing batch %d (%d devices)", batch_index, len(batch))
+
+        # itemgetter runs the key extraction in C
+        k_numbers = list(map(itemgetter('k_number'), batch))
+
+        if k_numbers and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sample device from batch: %s", k_numbers[0])
+
+        # Stored HTTP validators let the download stage revalidate instead
+        # of re-transferring PDFs that have not changed server-side; on a
+        # refresh run most devices answer 304 and keep their stored result
+        cached = {doc['k_number']: doc for doc in collection.find(
+            {'k_number': {'$in': k_numbers}, 'pdf_etag': {'$exists': True}},
+            {'k_number': 1, 'pdf_etag': 1, 'pdf_last_modified': 1,
+             'predicate_devices': 1, '_id': 0})}
+
+        results = process_knumbers_for_pdfs(k_numbers, max_workers=max_workers,
+                                            cached=cached)
+
+        # One bulk write per batch instead of a round trip per device
+        checked_at = datetime.utcnow()
+        ops = []
+        for k_number, result in results.items():
+            predicates = result.get('predicates', [])
+            ops.append(UpdateOne(
+                {'k_number': k_number},
+                {'$set': {'predicate_devices': predicates,
+                          'pdf_exists': result.get('pdf_exists', False),
+                          'pdf_url': result.get('pdf_url'),
+                          'pdf_etag': result.get('pdf_etag'),
+                          'pdf_last_modified': result.get('pdf_last_modified'),
+                          'pdf_checked_at': checked_at,
+                          'processed_at': checked_at}}
+            ))
+            processed += 1
+            if predicates:
+                updated += 1
+        if ops:
+            write_result = collection.bulk_write(ops, ordered=False)
+            logger.debug("Batch write: %d modified", write_result.modified_count)
+
+    logger.info(f"Processed {processed} devices, {updated} with predicates")
+    return processed, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk predicate extraction from 510(k) PDFs")
+    parser.add_argument('--pdf-input-file',
+                        help="JSON file with a list of K-numbers to process instead of querying MongoDB")
+    parser.add_argument('--pdf-output-file',
+                        help="Write per-K-number results to this JSON file")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Maximum number of devices to process")
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help="Devices per processing batch")
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Concurrent PDF download/parse workers")
+    parser.add_argument('--existence-only', action='store_true',
+                        help="Only check whether PDFs exist (HEAD requests)")
+    parser.add_argument('--refresh-days', type=int, default=None,
+                        help="Also re-process devices last processed more than this many days ago")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    if args.pdf_input_file:
+        # Memory-map the list so the OS page cache backs the raw bytes
+        # and Python never holds its own copy alongside the parsed result
+        with open(args.pdf_input_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                k_numbers = orjson.loads(mm)
+        results = process_knumbers_for_pdfs(k_numbers, max_workers=args.max_workers,
+                                            existence_only=args.existence_only)
+        if args.pdf_output_file:
+            with open(args.pdf_output_file, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+        found = sum(1 for r in results.values() if r.get('predicates'))
+        logger.info(f"Processed {len(results)} K-numbers, {found} with predicates")
+    else:
+        extract_predicates_bulk(limit=args.limit, batch_size=args.batch_size,
+                                max_workers=args.max_workers,
+                                refresh_days=args.refresh_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,52 +5,162 @@ Predicate Device Analyzer API
 A REST API to extract predicate device relationships from FDA 510(k) PDFs.
 """
 
+import asyncio
 import os
-import sys
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Body
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, HTTPException, Body, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-import requests
+import httpx
+import orjson
 import uvicorn
 
-# Add the parent directory to sys.path to allow imports from the project
-sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
-
 from src.utils.config import setup_logging
-from src.pdf.utils import get_pdf_url, fetch_pdf_content, parse_pdf
-from src.pdf.processor import process_pdf_for_predicates, normalize_knumber
+from src.pdf.utils import get_pdf_url, fetch_pdf_content_async, parse_and_extract
+from src.pdf.processor import normalize_knumber
 from src.db.mongodb import (
     test_mongodb_connection, 
     get_device_by_knumber, 
+    get_device_exists,
+    get_devices_collection,
     save_device_to_mongodb,
     initialize_db_connection
 )
+from pymongo import UpdateOne
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Shared async HTTP client; created at startup so keep-alive connections
+# to OpenFDA are reused across requests
+_http: Optional[httpx.AsyncClient] = None
+
+# PDF parsing and regex extraction are CPU-bound; running them in worker
+# processes keeps the event loop free and uses all cores
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+# Write-behind queue: device saves triggered by GET requests don't need to
+# commit before the response goes out, so they're batched in the background
+_SAVE_BATCH_MAX = 100
+_SAVE_BATCH_WINDOW = 0.05  # seconds
+_save_queue: Optional[asyncio.Queue] = None
+_save_task: Optional[asyncio.Task] = None
+
+async def _save_worker() -> None:
+    """Drain queued device documents into batched bulk upserts."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _save_queue.get()]
+        deadline = loop.time() + _SAVE_BATCH_WINDOW
+        while len(batch) < _SAVE_BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_save_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        ops = [UpdateOne({'k_number': d['k_number']}, {'$set': d}, upsert=True)
+               for d in batch]
+        try:
+            await asyncio.to_thread(
+                lambda: get_devices_collection().bulk_write(ops, ordered=False))
+            logger.debug("Write-behind flushed %d device(s)", len(batch))
+        except Exception as e:
+            logger.error(f"Write-behind save failed for {len(batch)} device(s): {str(e)}")
+
+def _enqueue_device_save(device: Dict[str, Any]) -> None:
+    """Queue a device document for background upsert."""
+    _invalidate_device_cache(device["k_number"])
+    _save_queue.put_nowait(device)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _http, _pdf_pool, _save_queue, _save_task
+    _http = httpx.AsyncClient(
+        timeout=DEFAULT_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=50, keepalive_expiry=30)
+    )
+    _pdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    _save_queue = asyncio.Queue()
+    _save_task = asyncio.create_task(_save_worker())
+    yield
+    _save_task.cancel()
+    await _http.aclose()
+    _http = None
+    _pdf_pool.shutdown(wait=False)
+    _pdf_pool = None
+
 # Create FastAPI application
 app = FastAPI(
     title="Predicate Device Analyzer API",
     description="API for extracting predicate device relationships from FDA 510(k) PDFs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "https://predicate-graph.vercel.app"
-    ],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["*"],
-)
+# CORS: the allow-list is two known origins, so a raw ASGI middleware
+# with pre-encoded header bytes beats Starlette's general-purpose one
+_ALLOWED_ORIGINS = frozenset((
+    b"http://localhost:3000",
+    b"https://predicate-graph.vercel.app",
+))
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"*"),
+]
+
+class FastCORS:
+    """Minimal ASGI CORS middleware for the app's fixed origin allow-list."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = dict(scope["headers"]).get(b"origin")
+        if origin not in _ALLOWED_ORIGINS:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            # Answer preflights directly instead of routing them
+            headers = [(b"access-control-allow-origin", origin),
+                       (b"vary", b"Origin")] + _PREFLIGHT_HEADERS
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message["headers"]) + [
+                    (b"access-control-allow-origin", origin),
+                    (b"access-control-allow-credentials", b"true"),
+                    (b"vary", b"Origin"),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+app.add_middleware(FastCORS)
+
+# Compress larger JSON bodies (predicate lists and text fields compress
+# well); responses under the threshold are passed through untouched
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
 
 # OpenFDA API settings
 OPENFDA_API_BASE_URL = "https://api.fda.gov/device/510k.json"
@@ -74,6 +184,78 @@ class DeviceResponse(BaseModel):
     statement_or_summary: Optional[str] = Field(None, description="Type of document (Statement or Summary)")
     predicate_devices: List[str] = Field(default_factory=list, description="List of predicate device K-numbers")
 
+# Process-local TTL LRU cache in front of MongoDB device lookups; hot
+# K-numbers requested repeatedly within the TTL skip the database entirely
+_DEVICE_CACHE_TTL = 60.0
+_DEVICE_CACHE_MAX = 4096
+# Entries are [timestamp, document, serialized_body]; the body is encoded
+# lazily the first time the cache-hit fast path needs it
+_device_cache: "OrderedDict[str, list]" = OrderedDict()
+
+def _cached_get_device(k_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a device by K-number, serving repeats from a short-lived cache.
+
+    Args:
+        k_number: The (normalized) K-number to look up
+
+    Returns:
+        A copy of the device document, or None if not found
+    """
+    now = time.monotonic()
+    entry = _device_cache.get(k_number)
+    if entry is not None and now - entry[0] < _DEVICE_CACHE_TTL:
+        _device_cache.move_to_end(k_number)
+        device = entry[1]
+    else:
+        device = get_device_by_knumber(k_number)
+        _device_cache[k_number] = [now, device, None]
+        _device_cache.move_to_end(k_number)
+        while len(_device_cache) > _DEVICE_CACHE_MAX:
+            _device_cache.popitem(last=False)
+    # Copy so callers can mutate the result without poisoning the cache
+    return dict(device) if device is not None else None
+
+# Storage-only fields that exist for indexing/bookkeeping and are not
+# part of the DeviceResponse schema; stripped from every response path
+# since no response_model projects documents onto the model anymore
+_INTERNAL_FIELDS = ("_id", "sortable_date")
+
+def _strip_internal_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove storage-only fields before a document leaves the API."""
+    for field in _INTERNAL_FIELDS:
+        doc.pop(field, None)
+    return doc
+
+def _cached_device_body(k_number: str) -> Optional[bytes]:
+    """
+    Get the pre-serialized response body for a cached device, if fresh.
+
+    Args:
+        k_number: The (normalized) K-number
+
+    Returns:
+        orjson-encoded body bytes, or None when not cached
+    """
+    entry = _device_cache.get(k_number)
+    if (entry is None or entry[1] is None
+            or time.monotonic() - entry[0] >= _DEVICE_CACHE_TTL):
+        return None
+    if entry[2] is None:
+        doc = _strip_internal_fields(dict(entry[1]))
+        entry[2] = orjson.dumps(doc)
+    return entry[2]
+
+def _invalidate_device_cache(k_number: str) -> None:
+    """Drop a K-number from the device cache after a write."""
+    _device_cache.pop(k_number, None)
+
+# Negative cache: devices with no PDF (or no predicates in it) would
+# otherwise re-run the full download+parse cycle on every request,
+# because an empty predicate list always triggers a refresh
+_NEGATIVE_CACHE_TTL = 3600.0
+_negative_cache: Dict[str, float] = {}
+
 async def fetch_device_from_openfda(k_number: str) -> Dict[str, Any]:
     """
     Fetch device information from the OpenFDA API
@@ -88,12 +270,14 @@ async def fetch_device_from_openfda(k_number: str) -> Dict[str, Any]:
         HTTPException: If the device is not found or other API errors occur
     """
     try:
-        # Build the API URL with the k_number as search parameter
-        url = f"{OPENFDA_API_BASE_URL}?search=k_number:{k_number}&limit=1"
-        
-        # Make the API request
+        # Make the API request; awaiting frees the event loop for other
+        # requests while OpenFDA responds. The base URL is parsed once by
+        # httpx and the search expression is encoded via params
         logger.info(f"Fetching device information for {k_number} from OpenFDA API")
-        response = requests.get(url, timeout=DEFAULT_TIMEOUT)
+        response = await _http.get(
+            OPENFDA_API_BASE_URL,
+            params={"search": f"k_number:{k_number}", "limit": 1}
+        )
         
         # Check for successful response
         if response.status_code == 200:
@@ -115,7 +299,7 @@ async def fetch_device_from_openfda(k_number: str) -> Dict[str, Any]:
             raise HTTPException(status_code=response.status_code, 
                                 detail=f"Error from OpenFDA API: {response.text}")
             
-    except requests.RequestException as e:
+    except httpx.RequestError as e:
         logger.error(f"Request error when fetching device from OpenFDA: {str(e)}")
         raise HTTPException(status_code=503, detail="Service Unavailable: Unable to connect to OpenFDA API")
 
@@ -135,7 +319,7 @@ async def extract_predicates_from_pdf(k_number: str) -> List[str]:
         logger.info(f"Checking PDF for {k_number} at {url}")
         
         # Download the PDF without saving to disk
-        pdf_content = fetch_pdf_content(url)
+        pdf_content = await fetch_pdf_content_async(url, _http)
         
         if not pdf_content:
             logger.info(f"No PDF found for {k_number}")
@@ -143,20 +327,21 @@ async def extract_predicates_from_pdf(k_number: str) -> List[str]:
         
         logger.info(f"PDF content retrieved for {k_number}, size: {len(pdf_content)} bytes")
         
-        # Parse the PDF
-        parsed_data = parse_pdf(pdf_content)
-        logger.info(f"PDF parsed for {k_number}, {parsed_data.get('pages', 0)} pages")
-        
-        # Extract predicate device information
-        predicates = process_pdf_for_predicates(parsed_data, device_k_number=k_number)
+        # Parse the PDF and extract predicates in one worker-pool hop
+        loop = asyncio.get_running_loop()
+        predicates, pages, text_sample = await loop.run_in_executor(
+            _pdf_pool, parse_and_extract, pdf_content, k_number)
+        logger.info(f"PDF parsed for {k_number}, {pages} pages")
         
         if predicates:
-            logger.info(f"Found {len(predicates)} predicate device(s) for {k_number}: {', '.join(predicates)}")
+            # %-style args are only formatted if the record is emitted
+            logger.info("Found %d predicate device(s) for %s: %s",
+                        len(predicates), k_number, predicates)
         else:
-            logger.info(f"No predicate devices found for {k_number}, checking text sample")
-            # Debugging: Check a sample of the text to see if key phrases are present
-            text_sample = parsed_data.get('text', '')[:5000]
-            logger.info(f"Text sample from PDF: {text_sample[:200]}...")
+            logger.info("No predicate devices found for %s", k_number)
+            if logger.isEnabledFor(logging.DEBUG):
+                # Debugging: sample the text to see if key phrases are present
+                logger.debug("Text sample from PDF: %s...", text_sample)
             
         return predicates
         
@@ -165,12 +350,21 @@ async def extract_predicates_from_pdf(k_number: str) -> List[str]:
         logger.exception(e)  # Log the full exception with traceback
         return []
 
+# The root body never changes; encode it once and return the bytes
+_ROOT_BODY = orjson.dumps({
+    "message": "Welcome to the Predicate Device Analyzer API. Visit /docs for API documentation."
+})
+
 @app.get("/", include_in_schema=False)
 async def root():
     """Root endpoint that redirects to the documentation."""
-    return {"message": "Welcome to the Predicate Device Analyzer API. Visit /docs for API documentation."}
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
-@app.get("/api/device/{k_number}", response_model=DeviceResponse, 
+# DeviceResponse is kept for the OpenAPI schema only; the handler returns
+# dicts (and pre-encoded bytes on the cache-hit path) without a second
+# validation pass
+@app.get("/api/device/{k_number}",
+         responses={200: {"model": DeviceResponse}},
          summary="Get device information with predicate relationships",
          description="Fetch device information from OpenFDA and extract predicate relationships from PDF summary")
 async def get_device(k_number: str, refresh_predicates: bool = False):
@@ -199,7 +393,7 @@ async def get_device(k_number: str, refresh_predicates: bool = False):
     # Check if MongoDB is available and device exists
     if mongodb_available:
         try:
-            existing_device = get_device_by_knumber(k_number)
+            existing_device = await asyncio.to_thread(_cached_get_device, k_number)
             if existing_device:
                 logger.info(f"Found device with K-number {k_number} in MongoDB with {len(existing_device.get('predicate_devices', []))} predicates")
         except Exception as e:
@@ -217,40 +411,66 @@ async def get_device(k_number: str, refresh_predicates: bool = False):
     )
     
     if existing_device and not needs_predicate_refresh:
-        # Remove MongoDB ID field
-        existing_device.pop("_id", None)
-        return existing_device
+        # Cache hit with nothing to refresh: return the bytes encoded on
+        # the first hit, skipping validation and serialization entirely
+        body = _cached_device_body(k_number)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+        # Remove storage-only fields
+        return _strip_internal_fields(existing_device)
     
     # We need to fetch device info or refresh predicates
     predicate_devices = []
+    device_info = None
     
     if needs_predicate_refresh:
-        # Extract predicate devices from PDF
-        logger.info(f"Extracting predicate devices for {k_number}")
-        predicate_devices = await extract_predicates_from_pdf(k_number)
-        logger.info(f"Predicate extraction complete for {k_number}: {predicate_devices}")
+        if time.monotonic() - _negative_cache.get(k_number, 0.0) < _NEGATIVE_CACHE_TTL:
+            # A recent extraction came back empty; don't re-download the PDF
+            logger.info(f"Skipping predicate extraction for {k_number} (recent empty result)")
+            if existing_device:
+                return _strip_internal_fields(existing_device)
+        elif existing_device is None:
+            # No stored device, so the OpenFDA fetch is coming anyway;
+            # run it concurrently with the PDF extraction since the two
+            # I/Os are independent
+            logger.info(f"Extracting predicate devices for {k_number}")
+            extract_task = asyncio.create_task(extract_predicates_from_pdf(k_number))
+            try:
+                device_info = await fetch_device_from_openfda(k_number)
+            except HTTPException:
+                extract_task.cancel()
+                raise
+            predicate_devices = await extract_task
+            if not predicate_devices:
+                _negative_cache[k_number] = time.monotonic()
+            logger.info(f"Predicate extraction complete for {k_number}: {predicate_devices}")
+        else:
+            # Extract predicate devices from PDF
+            logger.info(f"Extracting predicate devices for {k_number}")
+            predicate_devices = await extract_predicates_from_pdf(k_number)
+            if not predicate_devices:
+                _negative_cache[k_number] = time.monotonic()
+            logger.info(f"Predicate extraction complete for {k_number}: {predicate_devices}")
     
     # If we have an existing device, update it with new predicates
     if existing_device and needs_predicate_refresh and mongodb_available:
         try:
-            existing_device.pop("_id", None)
+            _strip_internal_fields(existing_device)
             existing_device["predicate_devices"] = predicate_devices
             
-            # Update MongoDB using save function
-            save_success = save_device_to_mongodb(existing_device)
-            
-            if save_success:
-                logger.info(f"Updated device {k_number} in MongoDB with {len(predicate_devices)} predicates")
-            else:
-                logger.warning(f"Failed to update device {k_number} in MongoDB")
+            # Queue the update; the client doesn't need the write committed
+            _enqueue_device_save(existing_device)
+            logger.info(f"Queued update for device {k_number} with {len(predicate_devices)} predicates")
                 
             return existing_device
         except Exception as e:
             logger.error(f"Error updating MongoDB: {e}")
             # Continue with fetching from OpenFDA
     
-    # If we get here, we need to fetch the device info from OpenFDA
-    device_info = await fetch_device_from_openfda(k_number)
+    # If we get here, we need the device info from OpenFDA (unless the
+    # concurrent branch above already fetched it)
+    if device_info is None:
+        device_info = await fetch_device_from_openfda(k_number)
     logger.info(f"Fetched device info from OpenFDA for {k_number}")
     
     # Create the response object
@@ -265,18 +485,17 @@ async def get_device(k_number: str, refresh_predicates: bool = False):
         "predicate_devices": predicate_devices
     }
     
-    # Save to MongoDB if available
+    # Queue the save to MongoDB if available; the write happens off the
+    # request's critical path
     if mongodb_available:
-        save_success = save_device_to_mongodb(response)
-        if save_success:
-            logger.info(f"Saved device {k_number} to MongoDB")
-        else:
-            logger.warning(f"Failed to save device {k_number} to MongoDB")
+        _enqueue_device_save(response)
     
     logger.info(f"Returning response for {k_number} with {len(predicate_devices)} predicates")
     return response
 
-@app.post("/api/device", response_model=DeviceResponse,
+# No response_model here: the inbound body is already validated, and
+# re-validating the same object on the way out doubles the Pydantic cost
+@app.post("/api/device",
          summary="Save device information to MongoDB",
          description="Save device information with predicate relationships to MongoDB")
 async def save_device(device: DeviceResponse = Body(...)):
@@ -294,17 +513,18 @@ async def save_device(device: DeviceResponse = Body(...)):
         
     try:
         # Convert the Pydantic model to a dictionary
-        device_dict = device.dict()
+        device_dict = device.model_dump()
         
         # Ensure K-number is normalized
         device_dict["k_number"] = normalize_knumber(device_dict["k_number"])
         
         # Save device using the db module function
-        save_success = save_device_to_mongodb(device_dict)
+        save_success = await asyncio.to_thread(save_device_to_mongodb, device_dict)
         
         if not save_success:
             raise Exception("Failed to save device to MongoDB")
             
+        _invalidate_device_cache(device_dict["k_number"])
         logger.info(f"Saved device with K-number {device_dict['k_number']} to MongoDB")
         
         return device
@@ -337,11 +557,12 @@ async def check_device(k_number: str):
         }
         
     try:
-        # Check if device exists in MongoDB using db module function
-        existing_device = get_device_by_knumber(k_number)
+        # Existence only: the index-backed count avoids pulling the whole
+        # document (and its predicate list) over the wire
+        exists = await asyncio.to_thread(get_device_exists, k_number)
         
         return {
-            "exists": existing_device is not None,
+            "exists": exists,
             "k_number": k_number
         }
     except Exception as e:
@@ -352,14 +573,24 @@ async def check_device(k_number: str):
             "error": f"MongoDB error: {str(e)}"
         }
 
+# Health probes poll frequently; reuse the Mongo check result briefly
+_HEALTH_TTL = 5.0
+_health_cache: Optional[tuple] = None
+
 @app.get("/api/health", summary="Health check endpoint", 
          description="Endpoint to check if the API is running correctly")
 async def health_check():
     """Health check endpoint to verify the API is working."""
-    # Include MongoDB status in health check
-    db_status = test_mongodb_connection()
+    global _health_cache
+    now = time.monotonic()
+    if _health_cache is not None and now - _health_cache[0] < _HEALTH_TTL:
+        return _health_cache[1]
+
+    # Include MongoDB status in health check; run the probe off-loop since
+    # it's a blocking pymongo call
+    db_status = await asyncio.to_thread(test_mongodb_connection)
     
-    return {
+    payload = {
         "status": "ok", 
         "version": "1.0.0",
         "mongodb": {
@@ -368,6 +599,8 @@ async def health_check():
             "device_count": db_status["device_count"] if db_status["success"] else 0
         }
     }
+    _health_cache = (now, payload)
+    return payload
 
 def main():
     """Start the FastAPI application with uvicorn server."""
@@ -377,8 +610,10 @@ def main():
     # Get host from environment variable or use default
     host = os.environ.get("HOST", "0.0.0.0")
     
-    # Start the uvicorn server
-    uvicorn.run("src.main:app", host=host, port=port, reload=True)
+    # Start the uvicorn server; uvloop and httptools are the C-backed
+    # event loop and HTTP parser from uvicorn[standard]
+    uvicorn.run("src.main:app", host=host, port=port,
+                loop="uvloop", http="httptools", reload=False)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
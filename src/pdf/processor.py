@@ -7,14 +7,81 @@ This module contains functions to extract predicate device K-numbers from PDF te
 
 import re
 import logging
+from bisect import bisect_right
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Set
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Compiled once at import; normalize_knumber runs on every API request
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9]')
+
+# All extraction patterns are compiled once at import. The extraction
+# functions run per line across every PDF, and literal-string re.* calls
+# pay a cache lookup each time (plus a re-parse whenever the 512-entry
+# re cache churns under load).
+
+# One pattern covering every K-number form in one pass: standard
+# 6-digit, digit groups split by whitespace, and OCR variants where the
+# letter 'O' stands in for the digit '0' (seen in K163547's predicate
+# list). OCR correction and format validation happen in the cleanup
+# loop, so no second scan of the text is needed.
+_K_ANY_RE = re.compile(r'\bK\s*[O0-9]{3}\s*[O0-9]{3,}\b', re.IGNORECASE)
+
+_BLANK_LINE_RE = re.compile(r'^\s*$')
+
+# The phrase groups are each fused into one alternation so the whole
+# text is scanned once per group by the C regex engine, instead of one
+# search per pattern per line from Python. The patterns are lowercase
+# literals run against a once-lowercased copy of the text, which is
+# cheaper than re.IGNORECASE case-folding every character comparison
+# inside the engine.
+
+# Phrases that indicate predicate devices
+_PREDICATE_UNION_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    r'predicate\s+device',
+    r'primary\s+predicate\s+device',
+    r'reference\s+predicate\s+device',
+    r'substantially\s+equivalent\s+device',
+    r'equivalent\s+legally\s+marketed\s+device',
+    r'reference\s+device',
+    r'comparable\s+device',
+    r'previously\s+cleared\s+device',
+)))
+
+# Table headers suggesting predicate device columns
+_TABLE_UNION_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    r'(predicate|reference|equivalent)\s*device',
+    r'510\(k\)\s*number',
+    r'k\s*number',
+    r'substantial\s*equivalence',
+    r'model',  # Many tables include "Model" as a column header alongside K-numbers
+)))
+
+# Section headings that mention predicates without the exact phrases above
+_SECTION_UNION_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    r'comparable\s+device',
+    r'equivalent\s+device',
+    r'reference\s+device',
+    r'predicate\s+identification',
+    r'substantial\s+equivalence',
+)))
+
+# Single combined scan that covers every phrase the per-line passes look
+# for; used as a cheap whole-text gate before the expensive extraction
+_PREDICATE_HINT_RE = re.compile(
+    r'predicate|equivalen|reference\s+device|comparable\s+device'
+    r'|previously\s+cleared|510\(k\)\s*number|k\s*number|model',
+    re.IGNORECASE)
+
+@lru_cache(maxsize=8192)
 def normalize_knumber(k_number: str) -> str:
     """
     Normalize a K-number to standard format.
+
+    Cached since steady-state traffic normalizes the same small set of
+    K-numbers over and over.
     
     Args:
         k_number: The K-number to normalize
@@ -22,8 +89,10 @@ def normalize_knumber(k_number: str) -> str:
     Returns:
         Normalized K-number
     """
-    # Remove any spaces or non-alphanumeric characters
-    k_number = re.sub(r'[^a-zA-Z0-9]', '', k_number)
+    # Remove any spaces or non-alphanumeric characters. Most inputs are
+    # already clean, so a C-level isalnum check skips the regex sub
+    if not k_number.isalnum():
+        k_number = _NON_ALNUM_RE.sub('', k_number)
     
     # Ensure K is uppercase
     if k_number.lower().startswith('k'):
@@ -31,54 +100,45 @@ def normalize_knumber(k_number: str) -> str:
     
     return k_number
 
-def extract_k_number_pattern(text: str) -> List[str]:
+@lru_cache(maxsize=4096)
+def extract_k_number_pattern(text: str) -> tuple:
     """
     Extract K-numbers using regex pattern matching.
     
+    Cached per input line: predicate, table, and section windows overlap
+    heavily in FDA summaries, so the same lines get harvested several
+    times per document. extract_predicate_devices clears the cache per
+    document to bound memory.
+    
     Args:
         text: The text content to search
         
     Returns:
-        List of K-numbers found
+        Tuple of K-numbers found, deduplicated in first-seen order
     """
-    # Standard pattern for K-numbers: K followed by 6 digits, with or without leading zeros
-    standard_pattern = r'\bK\s*\d{6,}\b|\bK\s*\d{3}\s*\d{3,}\b'
-    
-    # Additionally, look for common OCR errors where 'O' is used instead of '0'
-    # I found an example for K163547, one of the predicates is written with the letter 'O' instead of number '0'
-    # This pattern looks for K followed by a mix of digits and the letter 'O'
-    ocr_error_pattern = r'\bK\s*[O0-9]{6,}\b'
+    # Cheapest possible reject: most lines contain no K at all
+    if 'K' not in text and 'k' not in text:
+        return ()
     
-    # Find all matches for both patterns
-    standard_matches = re.findall(standard_pattern, text, re.IGNORECASE)
-    ocr_error_matches = re.findall(ocr_error_pattern, text, re.IGNORECASE)
-    
-    # Combine all matches
-    all_matches = standard_matches + ocr_error_matches
+    # One scan of the text catches standard, spaced, and OCR-damaged forms
+    matches = _K_ANY_RE.findall(text)
     
     # Clean up the matches: remove spaces, ensure uppercase K, correct OCR errors
     k_numbers = []
-    for match in all_matches:
-        # Remove spaces
-        cleaned = re.sub(r'\s+', '', match).upper()
+    for match in matches:
+        # Strip internal whitespace and uppercase via C-level string ops
+        cleaned = ''.join(match.split()).upper()
         
         # Correct common OCR errors - replace letter 'O' with digit '0' after the K
-        if re.match(r'^K[O0-9]{6}$', cleaned):
-            cleaned = 'K' + cleaned[1:].replace('O', '0')
+        cleaned = 'K' + cleaned[1:].replace('O', '0')
         
         # Only keep it if it now matches the standard K-number format
-        if re.match(r'^K\d{6}$', cleaned):
+        if len(cleaned) == 7 and cleaned[1:].isdigit():
             k_numbers.append(cleaned)
     
-    # Remove duplicates while preserving order
-    unique_k_numbers = []
-    seen = set()
-    for k in k_numbers:
-        if k not in seen:
-            unique_k_numbers.append(k)
-            seen.add(k)
-    
-    return unique_k_numbers
+    # Remove duplicates while preserving order; dict.fromkeys dedups
+    # inside CPython's dict implementation rather than a Python loop
+    return tuple(dict.fromkeys(k_numbers))
 
 def extract_predicate_devices(text: str, device_k_number: Optional[str] = None) -> List[str]:
     """
@@ -93,110 +153,96 @@ def extract_predicate_devices(text: str, device_k_number: Optional[str] = None)
     """
     predicate_devices = set()
     
-    # Break the text into lines to make it easier to process
+    # Per-document line cache: overlapping windows re-harvest the same
+    # lines; clearing here keeps entries from leaking across documents
+    extract_k_number_pattern.cache_clear()
+    
+    # Break the text into lines to make it easier to process. Phrase
+    # scans run over a lowercased copy so the patterns stay
+    # case-sensitive; K-number harvesting uses the original lines.
+    # Offsets come from the lowercased copy since lowercasing can change
+    # character counts for rare Unicode characters ('\n' never changes,
+    # so line indices always agree between the two)
     lines = text.split('\n')
+    norm = text.lower()
     
-    # List of patterns that indicate predicate devices
-    predicate_patterns = [
-        r'predicate\s+device',
-        r'primary\s+predicate\s+device',
-        r'reference\s+predicate\s+device',
-        r'substantially\s+equivalent\s+device',
-        r'equivalent\s+legally\s+marketed\s+device',
-        r'reference\s+device',
-        r'comparable\s+device',
-        r'previously\s+cleared\s+device',
-    ]
-    
-    # Pattern for K-numbers
-    k_pattern = r'K\d{6}'
-    
-    # First, look for lines containing predicate device phrases
-    potential_lines = []
-    for i, line in enumerate(lines):
-        for pattern in predicate_patterns:
-            if re.search(pattern, line, re.IGNORECASE):
-                # Add this line and a few following lines to check for K-numbers
-                potential_lines.extend([(i, line)] + [(i+j, lines[i+j]) for j in range(1, 4) if i+j < len(lines)])
-                break
+    # Offsets of each line start; bisect maps a full-text match position
+    # back to its line index, so each phrase group needs just one
+    # finditer pass over the whole text instead of a search per line
+    line_starts = [0]
+    offset = 0
+    for line in norm.split('\n')[:-1]:
+        offset += len(line) + 1
+        line_starts.append(offset)
+    
+    # First, look for lines containing predicate device phrases; check
+    # each hit line and a few following lines for K-numbers
+    potential_lines = set()
+    for match in _PREDICATE_UNION_RE.finditer(norm):
+        i = bisect_right(line_starts, match.start()) - 1
+        potential_lines.update(range(i, min(i + 4, len(lines))))
     
     # Now check these lines for K-numbers
-    for i, line in potential_lines:
+    for i in sorted(potential_lines):
+        line = lines[i]
+        if 'K' not in line and 'k' not in line:
+            continue
         k_numbers = extract_k_number_pattern(line)
         for k in k_numbers:
             predicate_devices.add(k)
     
     # Look for table-formatted predicate devices
     # This is complex and might need context from surrounding rows/columns
-    table_indicators = [
-        # Check for table headers suggesting predicate device columns
-        r'(predicate|reference|equivalent)\s*device',
-        r'510\(k\)\s*number',
-        r'k\s*number',
-        r'substantial\s*equivalence',
-        r'model'  # Many tables include "Model" as a column header alongside K-numbers
-    ]
-    
     table_sections = []
-    for i, line in enumerate(lines):
-        for indicator in table_indicators:
-            if re.search(indicator, line, re.IGNORECASE):
-                # If we find a table header, mark this as a potential table section
-                table_sections.append((max(0, i-2), min(len(lines), i+20)))  # Expanded range to capture more of the table
-                break
-    
-    # Process all identified table sections
-    for start, end in table_sections:
-        table_text = "\n".join(lines[start:end])
-        # Extract all K-numbers from the table section
-        k_numbers = extract_k_number_pattern(table_text)
-        for k in k_numbers:
-            predicate_devices.add(k)
-        
-        # Special handling for tables with rows containing K-numbers
-        # Look for rows that might contain K-numbers (often formatted differently)
+    for match in _TABLE_UNION_RE.finditer(norm):
+        # If we find a table header, mark this as a potential table section
+        i = bisect_right(line_starts, match.start()) - 1
+        table_sections.append((max(0, i-2), min(len(lines), i+20)))  # Expanded range to capture more of the table
+    
+    # Merge overlapping windows so each table line is scanned exactly
+    # once, even when several headers mark the same table
+    merged_sections = []
+    for start, end in sorted(table_sections):
+        if merged_sections and start <= merged_sections[-1][1]:
+            merged_sections[-1][1] = max(merged_sections[-1][1], end)
+        else:
+            merged_sections.append([start, end])
+    
+    # Single pass over each merged section: harvest K-number rows, and
+    # carry one bit of state so a non-blank line directly after a
+    # K-number row is also harvested (table cells can span lines). The
+    # row gate uses the permissive pattern so whitespace-split and
+    # OCR-damaged K-numbers still count as K-number rows
+    for start, end in merged_sections:
+        prev_had_k = False
         for i in range(start, end):
             line = lines[i]
-            # Check if this line could be a table row with a K-number
-            if re.search(r'K\d{6}', line, re.IGNORECASE):
-                # Examine this line carefully
-                line_k_numbers = extract_k_number_pattern(line)
-                for k in line_k_numbers:
+            if _K_ANY_RE.search(line):
+                for k in extract_k_number_pattern(line):
                     predicate_devices.add(k)
-                    
-                    # Sometimes table cells can span across multiple lines
-                    # Check if the next line might continue this entry
-                    if i+1 < end:
-                        next_line = lines[i+1]
-                        if not re.search(r'K\d{6}', next_line, re.IGNORECASE) and not re.search(r'^\s*$', next_line):
-                            # If the next line doesn't have a K-number and isn't just whitespace
-                            # it might contain relevant information like model names
-                            # This helps with complex tables that span multiple lines
-                            next_line_k_numbers = extract_k_number_pattern(next_line)
-                            for k in next_line_k_numbers:
-                                predicate_devices.add(k)
+                prev_had_k = True
+            else:
+                if prev_had_k and not _BLANK_LINE_RE.match(line):
+                    # Continuation of the previous row: might hold the
+                    # rest of a split entry or related model names
+                    for k in extract_k_number_pattern(line):
+                        predicate_devices.add(k)
+                prev_had_k = False
     
     # Additional pass to find K-numbers in sections that might mention predicates
     # but without using the exact phrases we checked earlier
-    section_start_indices = []
-    section_patterns = [
-        r'(?i)comparable\s+device',
-        r'(?i)equivalent\s+device',
-        r'(?i)reference\s+device',
-        r'(?i)predicate\s+identification',
-        r'(?i)substantial\s+equivalence',
-    ]
-    
-    for i, line in enumerate(lines):
-        for pattern in section_patterns:
-            if re.search(pattern, line, re.IGNORECASE):
-                section_start_indices.append(i)
+    section_start_indices = list(dict.fromkeys(
+        bisect_right(line_starts, match.start()) - 1
+        for match in _SECTION_UNION_RE.finditer(norm)))
     
     for start_idx in section_start_indices:
         # Check the next few lines after each section start
         end_idx = min(start_idx + 15, len(lines))
         for i in range(start_idx, end_idx):
-            k_numbers = extract_k_number_pattern(lines[i])
+            line = lines[i]
+            if 'K' not in line and 'k' not in line:
+                continue
+            k_numbers = extract_k_number_pattern(line)
             for k in k_numbers:
                 predicate_devices.add(k)
     
@@ -226,6 +272,11 @@ def process_pdf_for_predicates(pdf_data: Dict[str, Any], device_k_number: Option
         return predicates
     
     text = pdf_data.get('text', '')
+    # Gate the line-by-line pattern passes behind two cheap whole-text
+    # checks: a K must appear at all, and at least one of the phrases the
+    # extractor keys on must be present
+    if ('K' not in text and 'k' not in text) or not _PREDICATE_HINT_RE.search(text):
+        return predicates
     predicates = extract_predicate_devices(text, device_k_number)
     return predicates
 
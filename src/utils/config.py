@@ -3,8 +3,11 @@
 Configuration settings for the Predicate Device Analyzer.
 """
 
+import atexit
 import os
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -12,6 +15,7 @@ load_dotenv()
 
 # Base directories
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
 
 # Default local MongoDB URI as fallback
 DEFAULT_MONGODB_URI = "mongodb://localhost:27017"
@@ -21,16 +25,39 @@ MONGODB_URI = os.environ.get('MONGODB_URI', DEFAULT_MONGODB_URI)
 MONGODB_DB = os.environ.get('MONGODB_DB', 'predicate_relationships')
 MONGODB_DEVICES_COLLECTION = os.environ.get('MONGODB_DEVICES_COLLECTION', 'devices')
 
+# Connection pool tuning (per deployment; defaults sized for the concurrent
+# bulk-write workers plus interactive API reads)
+MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 5))
+
+# OpenFDA rate limits (requests per minute / per day with an API key)
+OPENFDA_RPM_LIMIT = int(os.environ.get('OPENFDA_RPM_LIMIT', 240))
+OPENFDA_DAILY_LIMIT = int(os.environ.get('OPENFDA_DAILY_LIMIT', 120000))
+
 def setup_logging(level=logging.INFO):
     """
     Configure logging for the application.
-    
+
+    Log records are funnelled through a QueueHandler to a QueueListener
+    thread, so worker threads never block on console I/O.
+
     Args:
         level: The logging level (default: INFO)
     """
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    logging.basicConfig(level=level, format=log_format)
-    
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(log_format))
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [QueueHandler(log_queue)]
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
     # Reduce verbose logging from third-party libraries
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
@@ -99,7 +99,7 @@ kill_port_process $FRONTEND_PORT
 
 # Start the FastAPI backend server
 echo "Starting FastAPI backend on port $BACKEND_PORT..."
-MONGODB_URI="$MONGODB_URI" PORT=$BACKEND_PORT python3 src/main.py 2>&1 | sed "s/^/${BLUE}[BACKEND]${NC} /" &
+MONGODB_URI="$MONGODB_URI" PORT=$BACKEND_PORT python3 -m src.main 2>&1 | sed "s/^/${BLUE}[BACKEND]${NC} /" &
 BACKEND_PID=$!
 
 # Wait longer to ensure backend is starting properly